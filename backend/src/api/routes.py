@@ -1,10 +1,14 @@
 from __future__ import annotations
 
 import asyncio
+from functools import partial
 from pathlib import Path
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, File, HTTPException, Request, UploadFile
+import aiofiles
+import anyio
+import orjson
+from fastapi import APIRouter, Depends, File, HTTPException, Request, Response, UploadFile
 
 from ..core.config import Settings
 from ..core.graph_manager import GraphManager
@@ -19,6 +23,13 @@ from ..models.schemas import (
 
 router = APIRouter(prefix="/api")
 
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _json_response(payload: dict) -> Response:
+    # graph payloads are large; orjson serialises them without FastAPI's jsonable_encoder pass
+    return Response(orjson.dumps(payload), media_type="application/json")
+
 
 def get_settings(request: Request) -> Settings:
     settings = getattr(request.app.state, "settings", None)
@@ -69,28 +80,21 @@ async def query_endpoint(
     except RuntimeError as exc:
         raise HTTPException(status_code=500, detail=str(exc)) from exc
 
-    query_entities = graph_manager.extract_entities(payload.query)
-    response_entities = graph_manager.extract_entities(response_text)
-    combined_entities = query_entities.union(response_entities)
-
-    graph_manager.update_conversation_context(
-        payload.query,
-        response_text,
-        combined_entities,
-        elapsed,
-    )
-
-    graph_data = None
-    if payload.include_graph:
-        subgraph = graph_manager.build_contextual_subgraph(
-            combined_entities,
+    combined_entities, graph_data = await anyio.to_thread.run_sync(
+        partial(
+            graph_manager.process_exchange,
+            payload.query,
+            response_text,
+            elapsed,
+            include_graph=payload.include_graph,
             max_hops=settings.MAX_HOPS,
             max_nodes=settings.MAX_GRAPH_NODES,
         )
-        graph_data = graph_manager.graph_to_vis_format(subgraph, combined_entities)
+    )
 
+    node_metadata = graph_manager.node_metadata
     entity_labels = [
-        graph_manager.node_metadata.get(node, {}).get("label", node)
+        meta["label"] if (meta := node_metadata.get(node)) else node
         for node in combined_entities
     ]
 
@@ -104,16 +108,18 @@ async def query_endpoint(
 
 
 @router.get("/graph/full")
-async def full_graph(graph_manager: GraphManagerDep) -> dict:
-    return graph_manager.graph_to_vis_format(graph_manager.graph, graph_manager.last_entities)
+def full_graph(graph_manager: GraphManagerDep) -> Response:
+    return _json_response(
+        graph_manager.graph_to_vis_format(graph_manager.graph, graph_manager.last_entities)
+    )
 
 
 @router.get("/graph/subgraph")
-async def subgraph_endpoint(
+def subgraph_endpoint(
     graph_manager: GraphManagerDep,
     settings: SettingsDep,
     entities: str | None = None,
-) -> dict:
+) -> Response:
     if not entities:
         raise HTTPException(status_code=400, detail="entities query parameter is required")
     requested = [entity.strip() for entity in entities.split(",") if entity.strip()]
@@ -126,11 +132,11 @@ async def subgraph_endpoint(
         max_hops=settings.MAX_HOPS,
         max_nodes=settings.MAX_GRAPH_NODES,
     )
-    return graph_manager.graph_to_vis_format(subgraph, node_ids)
+    return _json_response(graph_manager.graph_to_vis_format(subgraph, node_ids))
 
 
 @router.get("/stats", response_model=GraphStats)
-async def stats_endpoint(graph_manager: GraphManagerDep) -> GraphStats:
+def stats_endpoint(graph_manager: GraphManagerDep) -> GraphStats:
     return graph_manager.get_graph_stats()
 
 
@@ -149,8 +155,9 @@ async def upload_document(
         destination = corpus_dir / f"{Path(filename).stem}_{counter}{Path(filename).suffix}"
         counter += 1
 
-    content = await file.read()
-    destination.write_bytes(content)
+    async with aiofiles.open(destination, "wb") as out:
+        while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+            await out.write(chunk)
 
     return {"status": "uploaded", "filename": destination.name}
 
@@ -166,7 +173,7 @@ async def ingest_documents(
     async def finalize() -> None:
         await lightrag.wait_for_ingestion()
         graph_manager.graph_path = lightrag.get_graph_path()
-        graph_manager.reload_graph()
+        await asyncio.to_thread(graph_manager.reload_graph)
         await lightrag.refresh_entity_cache()
 
     asyncio.create_task(finalize())
@@ -1,11 +1,33 @@
 from __future__ import annotations
 
-import json
+import time
+from functools import partial
+from typing import Any
+
+import anyio
+import msgspec
+import orjson
 from fastapi import WebSocket, WebSocketDisconnect
 
 from ..core.graph_manager import GraphManager
 from ..core.lightrag_wrapper import LightRAGWrapper
-from ..models.schemas import Message
+from ..models.schemas import WebSocketQuery
+
+_query_decoder = msgspec.json.Decoder(WebSocketQuery)
+
+
+async def _send_json(websocket: WebSocket, payload: dict[str, Any]) -> None:
+    # text frames keep the browser-side JSON.parse(event.data) working
+    await websocket.send_text(orjson.dumps(payload).decode())
+
+
+async def _receive_frame(websocket: WebSocket) -> str | bytes:
+    # accept text or binary frames without a bytes -> str -> bytes round-trip
+    message = await websocket.receive()
+    if message["type"] == "websocket.disconnect":
+        raise WebSocketDisconnect(message.get("code", 1000), message.get("reason"))
+    text = message.get("text")
+    return text if text is not None else message.get("bytes") or b""
 
 
 async def websocket_handler(websocket: WebSocket) -> None:
@@ -17,62 +39,73 @@ async def websocket_handler(websocket: WebSocket) -> None:
 
     try:
         while True:
-            data = await websocket.receive_text()
+            data = await _receive_frame(websocket)
             try:
-                payload = json.loads(data)
-            except json.JSONDecodeError:
-                await websocket.send_json({"type": "error", "error": "Invalid JSON payload"})
+                payload = _query_decoder.decode(data)
+            except msgspec.ValidationError as exc:
+                await _send_json(websocket, {"type": "error", "error": f"Invalid payload: {exc}"})
+                continue
+            except msgspec.DecodeError:
+                await _send_json(websocket, {"type": "error", "error": "Invalid JSON payload"})
                 continue
 
-            if payload.get("type") != "query":
-                await websocket.send_json({"type": "error", "error": "Unsupported message type"})
+            if payload.type != "query":
+                await _send_json(websocket, {"type": "error", "error": "Unsupported message type"})
                 continue
 
-            query: str = payload.get("query", "")
-            mode: str = payload.get("mode", "hybrid")
-            history_payload = payload.get("conversation_history", [])
-            history = [Message.model_validate(message) for message in history_payload][-10:]
+            query = payload.query
+            mode = payload.mode
+            history = payload.conversation_history[-10:]
 
             try:
-                response_text, elapsed = await lightrag.query(
+                response, elapsed = await lightrag.query(
                     query,
                     mode=mode,
                     conversation_history=history,
                     history_turns=min(len(history), 5),
+                    stream=True,
                 )
+                if isinstance(response, str):
+                    response_text = response
+                else:
+                    # forward chunks as they arrive; the final "response" message still carries the full text
+                    stream_start = time.monotonic_ns()
+                    parts: list[str] = []
+                    async for chunk in response:
+                        parts.append(chunk)
+                        await _send_json(websocket, {"type": "response_chunk", "chunk": chunk, "done": False})
+                    response_text = "".join(parts)
+                    elapsed += (time.monotonic_ns() - stream_start) / 1e9
+            except WebSocketDisconnect:
+                raise
             except Exception as exc:  # pragma: no cover - runtime safety
-                await websocket.send_json({"type": "error", "error": str(exc)})
+                await _send_json(websocket, {"type": "error", "error": str(exc)})
                 continue
 
-            query_entities = graph_manager.extract_entities(query)
-            response_entities = graph_manager.extract_entities(response_text)
-            combined_entities = query_entities.union(response_entities)
-
-            graph_manager.update_conversation_context(
-                query,
-                response_text,
-                combined_entities,
-                elapsed,
-            )
-
-            subgraph = graph_manager.build_contextual_subgraph(
-                combined_entities,
-                max_hops=settings.MAX_HOPS,
-                max_nodes=settings.MAX_GRAPH_NODES,
+            combined_entities, graph_payload = await anyio.to_thread.run_sync(
+                partial(
+                    graph_manager.process_exchange,
+                    query,
+                    response_text,
+                    elapsed,
+                    max_hops=settings.MAX_HOPS,
+                    max_nodes=settings.MAX_GRAPH_NODES,
+                )
             )
-            graph_payload = graph_manager.graph_to_vis_format(subgraph, combined_entities)
+            node_metadata = graph_manager.node_metadata
 
-            await websocket.send_json(
+            await _send_json(
+                websocket,
                 {
                     "type": "response",
                     "response": response_text,
                     "graph": graph_payload,
                     "entities": [
-                        graph_manager.node_metadata.get(node, {}).get("label", node)
+                        meta["label"] if (meta := node_metadata.get(node)) else node
                         for node in combined_entities
                     ],
                     "processing_time": elapsed,
-                }
+                },
             )
     except WebSocketDisconnect:
         return
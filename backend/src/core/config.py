@@ -27,6 +27,12 @@ class Settings(BaseSettings):
     LIGHTRAG_MAX_TOKENS: int = 32_000
     MAX_PARALLEL_INSERT: int = 4
 
+    # Query response cache
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_TTL_SECONDS: int = 86_400
+    QUERY_CACHE_WITH_HISTORY: bool = False
+    SEMANTIC_CACHE_THRESHOLD: float = 0.95
+
     # OpenAI configuration (required when using OpenAI-powered LightRAG)
     OPENAI_API_KEY: str
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-large"
@@ -43,8 +49,10 @@ class Settings(BaseSettings):
 
     # Document ingestion
     CORPUS_DIR: str = "./data/corpus"
+    INGEST_BATCH_SIZE: int = 16
+    INGEST_BATCH_BYTES: int = 4 * 1024 * 1024
 
-    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True)
+    model_config = SettingsConfigDict(env_file=".env", case_sensitive=True, frozen=True)
 
     @property
     def corpus_path(self) -> Path:
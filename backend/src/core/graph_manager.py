@@ -1,13 +1,22 @@
 from __future__ import annotations
 
+import hashlib
+import heapq
+import io
 import math
 import logging
-from collections import defaultdict
-from datetime import datetime, timezone
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from functools import wraps
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Callable, Generic, Hashable, Iterable, Optional, TypeVar
 
+import ahocorasick
+import igraph as ig
 import networkx as nx
+import numpy as np
+import orjson
 
 from ..models.schemas import GraphStats
 from .config import Settings
@@ -23,6 +32,56 @@ ENTITY_COLORS = {
     "DATE": "#17becf",
 }
 
+EXTRACT_CACHE_SIZE = 1024
+TRAVERSAL_CACHE_SIZE = 4096
+MOST_DISCUSSED_LIMIT = 5
+
+_K = TypeVar("_K", bound=Hashable)
+_V = TypeVar("_V")
+_F = TypeVar("_F", bound=Callable)
+
+
+def _synchronized(method: _F) -> _F:
+    """Serialise access to GraphManager state across worker threads."""
+
+    @wraps(method)
+    def wrapper(self: GraphManager, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper  # type: ignore[return-value]
+
+
+def _is_word_char(char: str) -> bool:
+    return char.isalnum() or char == "_"
+
+
+class _LRUCache(Generic[_K, _V]):
+    """Small bounded mapping that evicts the least recently used entry."""
+
+    def __init__(self, maxsize: int) -> None:
+        self.maxsize = maxsize
+        self._data: OrderedDict[_K, _V] = OrderedDict()
+
+    def get(self, key: _K) -> _V | None:
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return None
+        return self._data[key]
+
+    def put(self, key: _K, value: _V) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
 
 class GraphManager:
     """Manage the LightRAG knowledge graph and conversation context."""
@@ -30,81 +89,239 @@ class GraphManager:
     def __init__(self, graph_path: Path, settings: Settings) -> None:
         self.settings = settings
         self.graph_path = graph_path
+        self._lock = threading.RLock()
+        # Settings is frozen, so the scoring weights can be bound once
+        self._importance_weights = (
+            settings.ENTITY_FREQUENCY_WEIGHT,
+            settings.RECENCY_WEIGHT,
+            settings.CENTRALITY_WEIGHT,
+            settings.FOCAL_WEIGHT,
+        )
         self.graph = nx.Graph()
         self.label_index: dict[str, set[str]] = defaultdict(set)
         self.node_metadata: dict[str, dict] = {}
-        self.entity_frequency: dict[str, float] = defaultdict(float)
-        self.entity_last_seen: dict[str, datetime] = {}
+        self._edge_links: dict[tuple[str, str], dict] = {}
+        self.entity_last_seen: dict[str, float] = {}
         self.total_queries = 0
         self.response_times: list[float] = []
         self.last_entities: set[str] = set()
         self.last_query: str | None = None
         self.last_response: str | None = None
         self._centrality: dict[str, float] = {}
+        self._ig = ig.Graph()
+        self._node_ids: list[str] = []
+        self._node_idx: dict[str, int] = {}
+        self._freq = np.zeros(0, dtype=np.float32)
+        self._automaton: ahocorasick.Automaton | None = None
+        self._extract_cache: _LRUCache[str, frozenset[str]] = _LRUCache(EXTRACT_CACHE_SIZE)
+        self._ego_cache: _LRUCache[tuple[frozenset[str], int], frozenset[str]] = _LRUCache(TRAVERSAL_CACHE_SIZE)
+        self._sp_cache: _LRUCache[tuple[str, frozenset[int]], list[str]] = _LRUCache(TRAVERSAL_CACHE_SIZE)
 
         self.reload_graph()
 
     def reload_graph(self) -> None:
-        """Load the graph from disk and rebuild indices."""
-
-        if self.graph_path.exists():
-            try:
-                self.graph = nx.read_graphml(self.graph_path)
-                LOGGER.info(
-                    "Loaded knowledge graph %s (%d nodes, %d edges)",
-                    self.graph_path,
-                    self.graph.number_of_nodes(),
-                    self.graph.number_of_edges(),
-                )
-            except Exception:  # pragma: no cover - defensive logging
-                LOGGER.exception("Failed to read graphml %s", self.graph_path)
-                self.graph = nx.Graph()
-        else:
+        """Load the graph from disk and rebuild indices.
+
+        The new graph and every derived index are built into locals first and only
+        swapped onto the manager under the lock, so threads serving queries never
+        observe a partially rebuilt state.
+        """
+
+        graph, digest = self._read_graph()
+        label_index, node_metadata = self._index_nodes(graph)
+        edge_links = {
+            (source, target): self._edge_payload(source, target, data)
+            for source, target, data in graph.edges(data=True)
+        }
+        automaton = self._build_automaton(label_index)
+        node_ids, node_idx, ig_graph = self._build_traversal_index(graph)
+        centrality = self._load_centrality(digest) if digest else None
+        if centrality is None:
+            centrality = self._compute_centrality(graph, ig_graph, node_ids)
+            if digest:
+                self._store_centrality(digest, centrality)
+
+        with self._lock:
+            self._freq = self._remap_frequencies(node_idx)
+            self.graph = graph
+            self.label_index = label_index
+            self.node_metadata = node_metadata
+            self._edge_links = edge_links
+            self._automaton = automaton
+            self._node_ids = node_ids
+            self._node_idx = node_idx
+            self._ig = ig_graph
+            self._centrality = centrality
+            self._extract_cache.clear()
+            self._ego_cache.clear()
+            self._sp_cache.clear()
+
+    def _read_graph(self) -> tuple[nx.Graph, str | None]:
+        """Parse the GraphML file and return it with a digest of its bytes."""
+
+        if not self.graph_path.exists():
             LOGGER.warning("Graph path %s does not exist yet", self.graph_path)
-            self.graph = nx.Graph()
+            return nx.Graph(), None
 
-        self._build_indices()
-        self._compute_centrality()
+        try:
+            raw = self.graph_path.read_bytes()
+            graph = nx.read_graphml(io.BytesIO(raw))
+        except Exception:  # pragma: no cover - defensive logging
+            LOGGER.exception("Failed to read graphml %s", self.graph_path)
+            return nx.Graph(), None
+
+        LOGGER.info(
+            "Loaded knowledge graph %s (%d nodes, %d edges)",
+            self.graph_path,
+            graph.number_of_nodes(),
+            graph.number_of_edges(),
+        )
+        return graph, hashlib.blake2b(raw).hexdigest()
+
+    @property
+    def _centrality_path(self) -> Path:
+        return self.graph_path.with_suffix(".centrality.json")
 
-    def _build_indices(self) -> None:
-        self.label_index.clear()
-        self.node_metadata.clear()
+    def _load_centrality(self, digest: str) -> dict[str, float] | None:
+        """Return persisted centrality scores if they match the current graph file."""
+
+        try:
+            cached = orjson.loads(self._centrality_path.read_bytes())
+        except FileNotFoundError:
+            return None
+        except (OSError, orjson.JSONDecodeError):
+            LOGGER.debug("Ignoring unreadable centrality cache", exc_info=True)
+            return None
+
+        if not isinstance(cached, dict) or cached.get("hash") != digest:
+            return None
+        return cached.get("centrality")
+
+    def _store_centrality(self, digest: str, centrality: dict[str, float]) -> None:
+        try:
+            self._centrality_path.write_bytes(orjson.dumps({"hash": digest, "centrality": centrality}))
+        except OSError:  # pragma: no cover - cache is best-effort
+            LOGGER.debug("Failed to persist centrality cache", exc_info=True)
 
-        for node_id, data in self.graph.nodes(data=True):
+    def _index_nodes(self, graph: nx.Graph) -> tuple[dict[str, set[str]], dict[str, dict]]:
+        label_index: dict[str, set[str]] = defaultdict(set)
+        node_metadata: dict[str, dict] = {}
+
+        for node_id, data in graph.nodes(data=True):
             label = self._resolve_label(node_id, data)
             lowered = label.lower()
-            self.label_index[lowered].add(node_id)
-            self.node_metadata[node_id] = {
+            label_index[lowered].add(node_id)
+            node_metadata[node_id] = {
                 "id": node_id,
                 "label": label,
                 "type": data.get("entity_type") or data.get("type") or "ENTITY",
                 "description": data.get("description") or data.get("summary") or "",
             }
 
-    def _compute_centrality(self) -> None:
-        if self.graph.number_of_nodes() == 0:
-            self._centrality = {}
-            return
+        return label_index, node_metadata
+
+    def _build_traversal_index(self, graph: nx.Graph) -> tuple[list[str], dict[str, int], ig.Graph]:
+        """Mirror the graph into igraph so traversals run over CSR arrays in C."""
+
+        node_ids = list(graph.nodes())
+        node_idx = {node_id: position for position, node_id in enumerate(node_ids)}
+
+        edges = []
+        weights = []
+        for source, target, weight in graph.edges(data="weight", default=1.0):
+            edges.append((node_idx[source], node_idx[target]))
+            weights.append(self._edge_weight(weight))
+
+        ig_graph = ig.Graph(n=len(node_ids), edges=edges, directed=graph.is_directed())
+        ig_graph.es["weight"] = weights
+        return node_ids, node_idx, ig_graph
+
+    def _remap_frequencies(self, node_idx: dict[str, int]) -> np.ndarray:
+        """Carry conversation frequencies over to a new vertex numbering."""
+
+        freq = np.zeros(len(node_idx), dtype=np.float32)
+        for position in np.flatnonzero(self._freq):
+            new_position = node_idx.get(self._node_ids[position])
+            if new_position is not None:
+                freq[new_position] = self._freq[position]
+        return freq
+
+    @staticmethod
+    def _edge_weight(value: object) -> float:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return 1.0
+
+    @staticmethod
+    def _build_automaton(label_index: dict[str, set[str]]) -> ahocorasick.Automaton | None:
+        """Compile every known label into a single multi-pattern matcher."""
+
+        automaton = ahocorasick.Automaton()
+        for label_lower, node_ids in label_index.items():
+            if label_lower:
+                automaton.add_word(label_lower, (label_lower, tuple(node_ids)))
+
+        if len(automaton) == 0:
+            return None
+        automaton.make_automaton()
+        return automaton
+
+    @staticmethod
+    def _compute_centrality(graph: nx.Graph, ig_graph: ig.Graph, node_ids: list[str]) -> dict[str, float]:
+        if graph.number_of_nodes() == 0:
+            return {}
 
         try:
-            self._centrality = nx.pagerank(self.graph, max_iter=100)
+            scores = ig_graph.pagerank(weights="weight", damping=0.85)
+            return dict(zip(node_ids, scores))
         except Exception:  # pragma: no cover - fallback
             LOGGER.debug("Falling back to degree centrality", exc_info=True)
-            self._centrality = nx.degree_centrality(self.graph)
+            return nx.degree_centrality(graph)
 
     @staticmethod
     def _resolve_label(node_id: str, data: dict) -> str:
         return str(data.get("name") or data.get("label") or data.get("title") or node_id)
 
-    def extract_entities(self, text: str) -> set[str]:
+    @classmethod
+    def _edge_payload(cls, source: str, target: str, data: dict) -> dict:
+        return {
+            "source": source,
+            "target": target,
+            "relationship": data.get("relation")
+            or data.get("label")
+            or data.get("type")
+            or "related",
+            "weight": cls._edge_weight(data.get("weight", 1.0)),
+            "keywords": data.get("keywords", ""),
+        }
+
+    @_synchronized
+    def extract_entities(self, text: str) -> frozenset[str]:
         """Return node ids whose label occurs in the provided text."""
 
+        if self._automaton is None or not text:
+            return frozenset()
+
+        cached = self._extract_cache.get(text)
+        if cached is not None:
+            return cached
+
         lowered = text.lower()
+        last = len(lowered) - 1
         matches: set[str] = set()
-        for label_lower, node_ids in self.label_index.items():
-            if label_lower in lowered:
-                matches.update(node_ids)
-        return matches
+        for end, (label_lower, node_ids) in self._automaton.iter(lowered):
+            # only accept whole-word hits so "art" does not match inside "smart"
+            start = end - len(label_lower) + 1
+            if start > 0 and _is_word_char(label_lower[0]) and _is_word_char(lowered[start - 1]):
+                continue
+            if end < last and _is_word_char(label_lower[-1]) and _is_word_char(lowered[end + 1]):
+                continue
+            matches.update(node_ids)
+
+        result = frozenset(matches)
+        self._extract_cache.put(text, result)
+        return result
 
     def resolve_labels_to_nodes(self, labels: Iterable[str]) -> set[str]:
         nodes: set[str] = set()
@@ -116,13 +333,18 @@ class GraphManager:
 
 
     def apply_temporal_decay(self) -> None:
-        if not self.entity_frequency:
+        if not self._freq.size:
             return
-        for node_id in list(self.entity_frequency.keys()):
-            self.entity_frequency[node_id] *= self.settings.TEMPORAL_DECAY_RATE
-            if self.entity_frequency[node_id] < 1e-4:
-                del self.entity_frequency[node_id]
+        self._freq *= self.settings.TEMPORAL_DECAY_RATE
+        self._freq[self._freq < 1e-4] = 0.0
+
+    def _frequency(self, node_id: str) -> float:
+        position = self._node_idx.get(node_id)
+        if position is None:
+            return 0.0
+        return float(self._freq[position])
 
+    @_synchronized
     def update_conversation_context(
         self,
         query: str,
@@ -130,12 +352,13 @@ class GraphManager:
         entities: Iterable[str],
         response_time: float,
     ) -> None:
-        now = datetime.utcnow().replace(tzinfo=timezone.utc)
+        now = time.time()
         entities = set(entities)
         self.apply_temporal_decay()
 
+        positions = [self._node_idx[entity] for entity in entities if entity in self._node_idx]
+        self._freq[positions] += 1.0
         for entity in entities:
-            self.entity_frequency[entity] += 1.0
             self.entity_last_seen[entity] = now
 
         self.last_entities = entities
@@ -144,31 +367,84 @@ class GraphManager:
         self.total_queries += 1
         self.response_times.append(response_time)
 
+    @_synchronized
+    def process_exchange(
+        self,
+        query: str,
+        response: str,
+        response_time: float,
+        *,
+        include_graph: bool = True,
+        max_hops: Optional[int] = None,
+        max_nodes: Optional[int] = None,
+    ) -> tuple[frozenset[str], dict | None]:
+        """Record a query/response pair and return its entities and graph payload.
+
+        This bundles the CPU-bound graph work of a single exchange so callers can
+        run it in a worker thread instead of on the event loop.
+        """
+
+        entities = self.extract_entities(query).union(self.extract_entities(response))
+        self.update_conversation_context(query, response, entities, response_time)
+
+        graph_data = None
+        if include_graph:
+            subgraph = self.build_contextual_subgraph(
+                entities,
+                max_hops=max_hops,
+                max_nodes=max_nodes,
+            )
+            graph_data = self.graph_to_vis_format(subgraph, entities)
+        return entities, graph_data
+
     def calculate_node_importance(self, node_id: str, focal_entities: set[str]) -> float:
-        freq = self.entity_frequency.get(node_id, 0.0)
-        max_freq = max(self.entity_frequency.values()) if self.entity_frequency else 1.0
+        max_freq, decay_rate, now = self._importance_factors()
+        return self._calculate_node_importance(
+            node_id,
+            focal_entities,
+            max_freq=max_freq,
+            decay_rate=decay_rate,
+            now=now,
+        )
+
+    def _importance_factors(self) -> tuple[float, float, float]:
+        """Return the per-request inputs shared by every importance score."""
+
+        max_freq = float(self._freq.max()) if self._freq.size else 1.0
+        decay_rate = -math.log(max(self.settings.TEMPORAL_DECAY_RATE, 1e-6))
+        return max_freq, decay_rate, time.time()
+
+    def _calculate_node_importance(
+        self,
+        node_id: str,
+        focal_entities: set[str],
+        *,
+        max_freq: float,
+        decay_rate: float,
+        now: float,
+    ) -> float:
+        freq_weight, recency_weight, centrality_weight, focal_weight = self._importance_weights
+        freq = self._frequency(node_id)
         freq_score = freq / max_freq if max_freq else 0.0
 
-        recency_score = self._recency_score(node_id)
+        timestamp = self.entity_last_seen.get(node_id)
+        if timestamp:
+            delta_hours = max((now - timestamp) / 3600.0, 0.0)
+            recency_score = math.exp(-decay_rate * delta_hours)
+        else:
+            recency_score = 0.0
+
         centrality_score = self._centrality.get(node_id, 0.0)
         focal_score = 1.0 if node_id in focal_entities else 0.0
 
         return (
-            self.settings.ENTITY_FREQUENCY_WEIGHT * freq_score
-            + self.settings.RECENCY_WEIGHT * recency_score
-            + self.settings.CENTRALITY_WEIGHT * centrality_score
-            + self.settings.FOCAL_WEIGHT * focal_score
+            freq_weight * freq_score
+            + recency_weight * recency_score
+            + centrality_weight * centrality_score
+            + focal_weight * focal_score
         )
 
-    def _recency_score(self, node_id: str) -> float:
-        timestamp = self.entity_last_seen.get(node_id)
-        if not timestamp:
-            return 0.0
-        now = datetime.utcnow().replace(tzinfo=timezone.utc)
-        delta_hours = max((now - timestamp).total_seconds() / 3600.0, 0.0)
-        decay_rate = -math.log(max(self.settings.TEMPORAL_DECAY_RATE, 1e-6))
-        return math.exp(-decay_rate * delta_hours)
-
+    @_synchronized
     def build_contextual_subgraph(
         self,
         focal_entities: set[str],
@@ -182,25 +458,29 @@ class GraphManager:
         max_hops = max_hops or self.settings.MAX_HOPS
         max_nodes = max_nodes or self.settings.MAX_GRAPH_NODES
 
-        candidate_nodes: set[str] = set()
-        for entity in focal_entities:
-            if entity not in self.graph:
-                continue
-            ego = nx.ego_graph(self.graph, entity, radius=max_hops)
-            candidate_nodes.update(ego.nodes)
+        candidate_nodes = self._expand_sources(focal_entities, max_hops)
 
         if not candidate_nodes:
             # fallback to most central nodes
-            sorted_nodes = sorted(
-                self.graph.nodes(),
-                key=lambda node: self._centrality.get(node, 0.0),
-                reverse=True,
+            candidate_nodes = set(
+                heapq.nlargest(
+                    max_nodes,
+                    self._node_ids,
+                    key=lambda node: self._centrality.get(node, 0.0),
+                )
             )
-            candidate_nodes = set(sorted_nodes[:max_nodes])
 
+        max_freq, decay_rate, now = self._importance_factors()
+        score_node = self._calculate_node_importance
         scored = []
         for node in candidate_nodes:
-            score = self.calculate_node_importance(node, focal_entities)
+            score = score_node(
+                node,
+                focal_entities,
+                max_freq=max_freq,
+                decay_rate=decay_rate,
+                now=now,
+            )
             scored.append((node, score))
 
         scored.sort(key=lambda item: item[1], reverse=True)
@@ -209,10 +489,67 @@ class GraphManager:
         if focal_entities:
             selected_nodes.update(focal_entities)
 
-        subgraph = self.graph.subgraph(selected_nodes).copy()
-        self._ensure_connectivity(subgraph, selected_nodes, focal_entities, max_nodes)
+        # a read-only view is enough to find components; copy only the final selection
+        self._ensure_connectivity(
+            self.graph.subgraph(selected_nodes),
+            selected_nodes,
+            focal_entities,
+            max_nodes,
+        )
         return self.graph.subgraph(selected_nodes).copy()
 
+    def _expand_sources(self, sources: Iterable[str], radius: int) -> set[str]:
+        """Return every node within ``radius`` hops of any source.
+
+        Single-source neighbourhoods are reused across focal sets; the sources
+        that miss are expanded together by :meth:`_multi_source_bfs`, whose
+        result is cached under that group of sources.
+        """
+
+        nodes: set[str] = set()
+        missed: list[str] = []
+        for source in sources:
+            if source not in self._node_idx:
+                continue
+            cached = self._ego_cache.get((frozenset((source,)), radius))
+            if cached is None:
+                missed.append(source)
+            else:
+                nodes |= cached
+
+        if missed:
+            nodes |= self._multi_source_bfs(frozenset(missed), radius)
+        return nodes
+
+    def _multi_source_bfs(self, seeds: frozenset[str], radius: int) -> frozenset[str]:
+        """Return every node within ``radius`` hops of any seed.
+
+        The BFS runs level by level from all seeds at once with a shared visited
+        set, so overlapping neighbourhoods are expanded only once. Each level is a
+        single igraph call over the whole frontier.
+        """
+
+        key = (seeds, radius)
+        cached = self._ego_cache.get(key)
+        if cached is not None:
+            return cached
+
+        frontier = [self._node_idx[seed] for seed in seeds]
+        visited = set(frontier)
+        for _ in range(radius):
+            reached: set[int] = set()
+            for neighbours in self._ig.neighborhood(vertices=frontier, order=1, mindist=1):
+                reached.update(neighbours)
+            frontier = list(reached - visited)
+            if not frontier:
+                break
+            visited.update(frontier)
+
+        node_ids = self._node_ids
+        result = frozenset(node_ids[position] for position in visited)
+        self._ego_cache.put(key, result)
+        return result
+
     def _ensure_connectivity(
         self,
         subgraph: nx.Graph,
@@ -231,8 +568,8 @@ class GraphManager:
         if len(components) <= 1:
             return
 
-        focal = [node for node in focal_entities if node in self.graph]
-        if not focal:
+        focal_idx = [self._node_idx[node] for node in focal_entities if node in self._node_idx]
+        if not focal_idx:
             return
 
         base_component = max(
@@ -244,45 +581,64 @@ class GraphManager:
             if component == base_component:
                 continue
             source = next(iter(component))
-            target = min(
-                focal,
-                key=lambda node: self._shortest_path_length_safe(source, node),
-            )
-            if target is None:
-                continue
-            path = self._shortest_path_safe(source, target)
+            path = self._shortest_path_to_any(source, focal_idx)
             for node in path:
                 selected_nodes.add(node)
                 if len(selected_nodes) >= max_nodes:
                     return
 
-    def _shortest_path_safe(self, src: str, dst: str) -> list[str]:
-        try:
-            return nx.shortest_path(self.graph, src, dst)
-        except (nx.NetworkXNoPath, nx.NodeNotFound):
+    def _shortest_path_to_any(self, src: str, targets: list[int]) -> list[str]:
+        """Return the shortest path from ``src`` to the closest of ``targets``."""
+
+        source = self._node_idx.get(src)
+        if source is None:
             return [src]
 
-    def _shortest_path_length_safe(self, src: str, dst: str) -> float:
-        try:
-            return nx.shortest_path_length(self.graph, src, dst)
-        except (nx.NetworkXNoPath, nx.NodeNotFound):
-            return math.inf
+        key = (src, frozenset(targets))
+        cached = self._sp_cache.get(key)
+        if cached is not None:
+            return cached
+
+        distances = self._ig.distances(source=source, target=targets)[0]
+        best = min(range(len(targets)), key=distances.__getitem__)
+        if math.isinf(distances[best]):
+            path = [src]
+        else:
+            path = [
+                self._node_ids[position]
+                for position in self._ig.get_shortest_path(source, to=targets[best])
+            ]
 
+        self._sp_cache.put(key, path)
+        return path
+
+    @_synchronized
     def graph_to_vis_format(self, subgraph: nx.Graph, focal_entities: set[str]) -> dict:
         nodes_payload = []
         links_payload = []
 
         max_importance = 0.0
         importance_cache: dict[str, float] = {}
+        max_freq, decay_rate, now = self._importance_factors()
+        score_node = self._calculate_node_importance
         for node in subgraph.nodes():
-            importance = self.calculate_node_importance(node, focal_entities)
+            importance = score_node(
+                node,
+                focal_entities,
+                max_freq=max_freq,
+                decay_rate=decay_rate,
+                now=now,
+            )
             importance_cache[node] = importance
             max_importance = max(max_importance, importance)
 
         scaling = max_importance or 1.0
+        node_metadata = self.node_metadata
+        centrality = self._centrality
+        frequency = self._frequency
 
         for node_id, data in subgraph.nodes(data=True):
-            meta = self.node_metadata.get(node_id, {})
+            meta = node_metadata.get(node_id, {})
             importance = importance_cache.get(node_id, 0.0)
             size = 8 + (importance / scaling) * 20
             node_type = meta.get("type", "ENTITY")
@@ -294,41 +650,45 @@ class GraphManager:
                     "label": meta.get("label") or self._resolve_label(node_id, data),
                     "type": node_type,
                     "description": meta.get("description", ""),
-                    "frequency": self.entity_frequency.get(node_id, 0.0),
+                    "frequency": frequency(node_id),
                     "is_focal": node_id in focal_entities,
                     "size": size,
                     "color": color,
-                    "centrality": self._centrality.get(node_id, 0.0),
+                    "centrality": centrality.get(node_id, 0.0),
                 }
             )
 
+        # link payloads are prebuilt at load time; undirected views may flip edge order
+        edge_links = self._edge_links
         for source, target, data in subgraph.edges(data=True):
-            links_payload.append(
-                {
-                    "source": source,
-                    "target": target,
-                    "relationship": data.get("relation")
-                    or data.get("label")
-                    or data.get("type")
-                    or "related",
-                    "weight": float(data.get("weight", 1.0)),
-                    "keywords": data.get("keywords", ""),
-                }
-            )
+            link = edge_links.get((source, target)) or edge_links.get((target, source))
+            if link is None:
+                link = self._edge_payload(source, target, data)
+            links_payload.append(link)
 
         return {"nodes": nodes_payload, "links": links_payload}
 
+    @_synchronized
     def get_graph_stats(self) -> GraphStats:
         avg_response = sum(self.response_times) / len(self.response_times) if self.response_times else 0.0
-        most_discussed = sorted(
-            ((self.node_metadata.get(node, {}).get("label", node), int(freq)) for node, freq in self.entity_frequency.items()),
-            key=lambda item: item[1],
-            reverse=True,
-        )[:5]
+        discussed = np.flatnonzero(self._freq)
+        top = discussed
+        if len(discussed) > MOST_DISCUSSED_LIMIT:
+            # O(N) selection of the top entries; only those few are sorted
+            partition = np.argpartition(-self._freq[discussed], MOST_DISCUSSED_LIMIT - 1)
+            top = discussed[partition[:MOST_DISCUSSED_LIMIT]]
+        ranked = top[np.argsort(-self._freq[top], kind="stable")]
+        most_discussed = [
+            (
+                self.node_metadata.get(self._node_ids[position], {}).get("label", self._node_ids[position]),
+                int(self._freq[position]),
+            )
+            for position in ranked
+        ]
 
         return GraphStats(
             total_queries=self.total_queries,
-            unique_entities=len(self.entity_frequency),
+            unique_entities=len(discussed),
             most_discussed=most_discussed,
             avg_response_time=avg_response,
             graph_node_count=self.graph.number_of_nodes(),
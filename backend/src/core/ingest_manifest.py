@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable
+
+LOGGER = logging.getLogger(__name__)
+
+
+class IngestManifest:
+    """SQLite record of documents already inserted into LightRAG.
+
+    Rows are keyed by the SHA-256 of the file contents and tagged with the
+    embedding model that produced them. Rows written for any other model are
+    dropped when the manifest is opened, so switching models re-ingests everything.
+    """
+
+    def __init__(self, path: Path, *, model: str) -> None:
+        self._model = model
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS ingest_manifest (
+                    hash TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    model TEXT NOT NULL,
+                    ts REAL NOT NULL
+                )
+                """
+            )
+            purged = self._conn.execute("DELETE FROM ingest_manifest WHERE model != ?", (model,)).rowcount
+        if purged:
+            LOGGER.info("Embedding model changed; cleared %d ingest manifest entries", purged)
+
+    def contains(self, digest: str) -> bool:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM ingest_manifest WHERE hash = ? AND model = ?",
+                (digest, self._model),
+            ).fetchone()
+        return row is not None
+
+    def recorded(self, digests: Iterable[str]) -> set[str]:
+        """Return the subset of ``digests`` already in the manifest."""
+
+        with self._lock:
+            return {
+                digest
+                for digest in digests
+                if self._conn.execute(
+                    "SELECT 1 FROM ingest_manifest WHERE hash = ? AND model = ?",
+                    (digest, self._model),
+                ).fetchone()
+            }
+
+    def record(self, entries: Iterable[tuple[str, Path]]) -> None:
+        now = time.time()
+        rows = [(digest, str(path), self._model, now) for digest, path in entries]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO ingest_manifest (hash, path, model, ts) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+__all__ = ["IngestManifest"]
@@ -3,23 +3,55 @@ from __future__ import annotations
 import asyncio
 import logging
 import time
+import weakref
 from collections import Counter
-from datetime import datetime
+from contextlib import AsyncExitStack
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import AsyncIterator, Iterable, Literal, Optional, Sequence
 
+import ahocorasick
+import numpy as np
 from lightrag import LightRAG, QueryParam
+from lightrag.base import DocStatus
 from lightrag.exceptions import PipelineNotInitializedError
 from lightrag.kg.shared_storage import initialize_pipeline_status
 from lightrag.llm.openai import openai_complete_if_cache, openai_embed
 from lightrag.utils import wrap_embedding_func_with_attrs
 
-from ..models.schemas import IngestStatus, Message
-from ..utils.helpers import iter_corpus_files, load_document_text, slugify
+from ..models.schemas import HistoryMessage, IngestStatus, Message
+from ..utils.helpers import (
+    aload_document_text,
+    chunked_by_size,
+    file_sha256,
+    iter_corpus_files,
+    slugify,
+    sort_by_size,
+)
 from .config import Settings
+from .ingest_manifest import IngestManifest
+from .query_cache import QueryCache
 
 LOGGER = logging.getLogger(__name__)
 
+_UTC = timezone.utc
+PROGRESS_REPORT_EVERY = 10
+PROGRESS_REPORT_INTERVAL = 30.0
+
+
+@dataclass(slots=True)
+class _IngestStatus:
+    """Mutable ingest progress; converted to ``IngestStatus`` at the API boundary."""
+
+    status: Literal["idle", "processing", "completed", "failed"] = "idle"
+    documents_processed: int = 0
+    total_documents: int = 0
+    current_file: Optional[str] = None
+    error: Optional[str] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
 
 class LightRAGWrapper:
     """High-level async wrapper around LightRAG."""
@@ -29,9 +61,16 @@ class LightRAGWrapper:
         self._rag: LightRAG | None = None
         self._initialized = False
         self._entity_cache: set[str] = set()
-        self._ingest_lock = asyncio.Lock()
+        self._entity_automaton: ahocorasick.Automaton | None = None
+        self._entity_refresh_lock = asyncio.Lock()
+        self._doc_locks: weakref.WeakValueDictionary[str, asyncio.Lock] = weakref.WeakValueDictionary()
         self._ingest_task: asyncio.Task[None] | None = None
-        self._ingest_status = IngestStatus()
+        self._ingest_status = _IngestStatus()
+        # runs since ingestion was last idle; overlapping runs are merged into _ingest_status
+        self._ingest_runs: list[_IngestStatus] = []
+        self._query_cache: QueryCache | None = None
+        self._ingest_manifest: IngestManifest | None = None
+        self._graph_path: Path | None = None
         self._embedding_func = self._build_embedding_func()
         self._llm_func = self._build_llm_func()
 
@@ -94,6 +133,16 @@ class LightRAGWrapper:
         await self._rag.initialize_storages()
         await initialize_pipeline_status()
         await self._refresh_entity_cache()
+        if self._settings.QUERY_CACHE_ENABLED:
+            self._query_cache = QueryCache(
+                workdir / "query_cache.db",
+                ttl_seconds=self._settings.QUERY_CACHE_TTL_SECONDS,
+                threshold=self._settings.SEMANTIC_CACHE_THRESHOLD,
+            )
+        self._ingest_manifest = IngestManifest(
+            workdir / "ingest_manifest.db",
+            model=self._settings.OPENAI_EMBEDDING_MODEL,
+        )
         self._initialized = True
         LOGGER.info("LightRAG initialised successfully")
 
@@ -104,6 +153,13 @@ class LightRAGWrapper:
             LOGGER.info("Finalising LightRAG storages")
             await self._rag.finalize_storages()
             self._rag = None
+        if self._query_cache:
+            self._query_cache.close()
+            self._query_cache = None
+        if self._ingest_manifest:
+            self._ingest_manifest.close()
+            self._ingest_manifest = None
+        self._graph_path = None
         self._initialized = False
 
     async def query(
@@ -111,30 +167,46 @@ class LightRAGWrapper:
         question: str,
         *,
         mode: str = "hybrid",
-        conversation_history: Sequence[Message] | None = None,
+        conversation_history: Sequence[Message | HistoryMessage] | None = None,
         user_prompt: str | None = None,
         history_turns: int = 3,
-    ) -> tuple[str, float]:
-        """Execute a LightRAG query and return the response and elapsed time."""
+        stream: bool = False,
+    ) -> tuple[str | AsyncIterator[str], float]:
+        """Execute a LightRAG query and return the response and elapsed time.
+
+        With ``stream=True`` the response may be an async iterator of text chunks;
+        the elapsed time then only covers the wait for the first chunk.
+        """
 
         if not self._initialized:
             raise RuntimeError("LightRAG must be initialised before querying")
 
-        conversation = [
-            {"role": msg.role, "content": msg.content}
-            for msg in (conversation_history or [])
-        ]
+        history = conversation_history or ()
         if history_turns:
-            conversation = conversation[-history_turns:]
+            history = history[-history_turns:]
+        conversation = [{"role": msg.role, "content": msg.content} for msg in history]
 
         params = QueryParam(
             mode=mode,
             conversation_history=conversation,
-            history_turns=len(conversation),
+            history_turns=history_turns,
             user_prompt=user_prompt,
+            stream=stream,
+        )
+
+        start = time.monotonic_ns()
+        # cached answers ignore history and prompts, so only reuse them for plain questions
+        cacheable = (
+            self._query_cache is not None
+            and not user_prompt
+            and (not conversation or self._settings.QUERY_CACHE_WITH_HISTORY)
         )
+        embedding = None
+        if cacheable:
+            cached, embedding = await self._lookup_cached_response(question, mode)
+            if cached is not None:
+                return cached, (time.monotonic_ns() - start) / 1e9
 
-        start = time.perf_counter()
         try:
             result = await self.rag.aquery(question, param=params)
         except PipelineNotInitializedError:
@@ -145,20 +217,61 @@ class LightRAGWrapper:
             LOGGER.exception("LightRAG query failed: %s", exc)
             raise RuntimeError("LightRAG query failed") from exc
 
-        elapsed = time.perf_counter() - start
+        elapsed = (time.monotonic_ns() - start) / 1e9
+
+        async def store(text: str) -> None:
+            if cacheable and text:
+                await asyncio.to_thread(self._query_cache.put, mode, question, embedding, text)
+
+        # ordered by frequency: LightRAG answers with a plain string unless streaming
         response_text: str
-        if isinstance(result, str):
+        if type(result) is str:
             response_text = result
-        elif hasattr(result, '__aiter__'):
-            chunks = [chunk async for chunk in result]
-            response_text = "".join(chunks)
         elif result is None:
             response_text = ""
+        elif hasattr(result, '__aiter__'):
+            if stream:
+                return self._stream_response(result, store), elapsed
+            buffer: list[str] = []
+            async for chunk in result:
+                buffer.append(chunk)
+            response_text = "".join(buffer)
         else:
             response_text = str(result)
 
+        await store(response_text)
         return response_text, elapsed
 
+    @staticmethod
+    async def _stream_response(chunks: AsyncIterator[str], on_complete) -> AsyncIterator[str]:
+        """Forward streamed chunks and hand the full text to ``on_complete`` once exhausted."""
+
+        buffer: list[str] = []
+        async for chunk in chunks:
+            buffer.append(chunk)
+            yield chunk
+        await on_complete("".join(buffer))
+
+    async def _lookup_cached_response(
+        self,
+        question: str,
+        mode: str,
+    ) -> tuple[str | None, np.ndarray | None]:
+        """Return a cached answer and the question embedding computed on the way."""
+
+        cache = self._query_cache
+        cached = await asyncio.to_thread(cache.get_exact, mode, question)
+        if cached is not None:
+            return cached, None
+
+        try:
+            embedding = np.asarray(await self._embedding_func([question]))[0]
+        except Exception:  # pragma: no cover - the exact-match tier still works
+            LOGGER.debug("Failed to embed question for the semantic cache", exc_info=True)
+            return None, None
+
+        return await asyncio.to_thread(cache.get_similar, mode, embedding), embedding
+
     async def insert_documents(self, texts: Sequence[str], ids: Sequence[str]) -> None:
         if not self._initialized:
             raise RuntimeError("LightRAG must be initialised before inserting documents")
@@ -173,67 +286,260 @@ class LightRAGWrapper:
         if not self._initialized:
             raise RuntimeError("LightRAG must be initialised before ingestion")
 
-        async with self._ingest_lock:
-            files = list(iter_corpus_files(corpus_dir))
-            if not files:
+        files = list(iter_corpus_files(corpus_dir))
+        run = _IngestStatus(status="processing", total_documents=len(files), started_at=datetime.now(_UTC))
+        self._ingest_runs.append(run)
+        self._publish_ingest_status()
+        errors: list[str] = []
+        try:
+            if files:
+                await self._ingest_files(files, run, errors)
+            else:
                 LOGGER.info("No documents found for ingestion in %s", corpus_dir)
-                self._ingest_status = IngestStatus(
-                    status="completed",
-                    documents_processed=0,
-                    total_documents=0,
-                    started_at=datetime.utcnow(),
-                    finished_at=datetime.utcnow(),
-                )
+        except BaseException as exc:
+            errors.append(f"ingestion aborted: {exc!r}")
+            raise
+        finally:
+            # terminal fields change together, so a concurrent publish never sees a half-finished run
+            run.status = "failed" if errors else "completed"
+            run.error = "; ".join(errors) if errors else None
+            run.current_file = None
+            run.finished_at = datetime.now(_UTC)
+            self._publish_ingest_status()
+
+    async def _ingest_files(self, files: list[Path], run: _IngestStatus, errors: list[str]) -> None:
+        """Insert ``files`` into LightRAG, recording progress on ``run`` and failures in ``errors``."""
+
+        processed = 0
+        unchanged = 0
+        inserted_any = False
+        manifest = self._ingest_manifest
+        total = len(files)
+        started = last_report = time.monotonic()
+        reported = 0
+        # largest first, so each batch holds documents of similar size
+        sized_files = await asyncio.to_thread(sort_by_size, files)
+        semaphore = asyncio.Semaphore(self._settings.MAX_PARALLEL_INSERT)
+        # producer parses the next batch while the current one is being inserted
+        batches: asyncio.Queue[list[tuple[Path, str, str, str]] | None] = asyncio.Queue(maxsize=2)
+
+        def report_progress() -> None:
+            nonlocal last_report, reported
+            done = processed + unchanged
+            now = time.monotonic()
+            if done - reported < PROGRESS_REPORT_EVERY and now - last_report < PROGRESS_REPORT_INTERVAL:
                 return
-
-            start_time = datetime.utcnow()
-            self._ingest_status = IngestStatus(
-                status="processing",
-                documents_processed=0,
-                total_documents=len(files),
-                started_at=start_time,
+            run.documents_processed = done
+            self._publish_ingest_status()
+            reported, last_report = done, now
+            rate = done / max(now - started, 1e-6)
+            LOGGER.info(
+                "Ingested %d/%d documents (%.1f docs/s, ETA %.0fs)",
+                done,
+                total,
+                rate,
+                (total - done) / rate if rate else float("inf"),
             )
 
-            errors: list[str] = []
-            processed = 0
+        async def load_one(doc_path: Path) -> tuple[Path, str, str, str] | None:
+            nonlocal unchanged
+            async with semaphore:
+                run.current_file = doc_path.name
+                try:
+                    digest = await asyncio.to_thread(file_sha256, doc_path)
+                    if manifest and await asyncio.to_thread(manifest.contains, digest):
+                        LOGGER.debug("Skipping unchanged document %s", doc_path)
+                        unchanged += 1
+                        report_progress()
+                        return None
+                    text = await aload_document_text(doc_path)
+                except Exception as exc:
+                    LOGGER.exception("Failed to ingest %s", doc_path)
+                    errors.append(f"{doc_path.name}: {exc}")
+                    return None
+            if not text.strip():
+                LOGGER.warning("Skipping empty document %s", doc_path)
+                return None
+            return doc_path, slugify(doc_path.stem), text, digest
+
+        async def produce() -> None:
+            seen_ids: set[str] = set()
+            cancelled = False
+            try:
+                for batch_paths in chunked_by_size(
+                    sized_files,
+                    self._settings.INGEST_BATCH_SIZE,
+                    self._settings.INGEST_BATCH_BYTES,
+                ):
+                    batch = []
+                    for loaded in await asyncio.gather(*(load_one(path) for path in batch_paths)):
+                        if loaded is None:
+                            continue
+                        doc_path, doc_id, _, _ = loaded
+                        if doc_id in seen_ids:
+                            LOGGER.warning("Skipping %s: document id %r already queued", doc_path, doc_id)
+                            continue
+                        seen_ids.add(doc_id)
+                        batch.append(loaded)
+                    if batch:
+                        await batches.put(batch)
+            except asyncio.CancelledError:
+                cancelled = True
+                raise
+            finally:
+                # a cancelled producer has no consumer left; waiting on a full queue would hang
+                if not cancelled:
+                    await batches.put(None)
+
+        async def insert_batch(batch: list[tuple[Path, str, str, str]]) -> list[tuple[Path, str, str, str]]:
+            """Insert a batch, falling back to one document at a time so only the culprit fails."""
+
+            try:
+                await self.insert_documents(
+                    [text for _, _, text, _ in batch],
+                    [doc_id for _, doc_id, _, _ in batch],
+                )
+                return batch
+            except Exception:
+                if len(batch) == 1:
+                    raise
+                LOGGER.warning("Batch of %d documents failed; retrying individually", len(batch), exc_info=True)
 
-            for doc_path in files:
-                self._ingest_status.current_file = doc_path.name
+            inserted = []
+            for entry in batch:
+                doc_path, doc_id, text, _ = entry
                 try:
-                    text = load_document_text(doc_path)
-                    if not text.strip():
-                        LOGGER.warning("Skipping empty document %s", doc_path)
-                        continue
-                    doc_id = slugify(doc_path.stem)
                     await self.insert_documents([text], [doc_id])
-                    processed += 1
-                    self._ingest_status.documents_processed = processed
                 except Exception as exc:
                     LOGGER.exception("Failed to ingest %s", doc_path)
                     errors.append(f"{doc_path.name}: {exc}")
                     continue
+                inserted.append(entry)
+            return inserted
 
-            status_value = "completed" if not errors else "failed"
-            self._ingest_status = IngestStatus(
-                status=status_value,
-                documents_processed=processed,
-                total_documents=len(files),
-                current_file=None,
-                error="; ".join(errors) if errors else None,
-                started_at=start_time,
-                finished_at=datetime.utcnow(),
-            )
+        producer = asyncio.create_task(produce())
+        try:
+            while (batch := await batches.get()) is not None:
+                try:
+                    async with AsyncExitStack() as stack:
+                        # sorted acquisition keeps concurrent runs from deadlocking on shared ids
+                        for doc_id in sorted({doc_id for _, doc_id, _, _ in batch}):
+                            await stack.enter_async_context(self._lock_for(doc_id))
+                        if manifest:
+                            # another run may have inserted the same content while we waited
+                            recorded = await asyncio.to_thread(manifest.recorded, [entry[3] for entry in batch])
+                            if recorded:
+                                unchanged += sum(1 for entry in batch if entry[3] in recorded)
+                                batch = [entry for entry in batch if entry[3] not in recorded]
+                        if batch:
+                            inserted_any = True
+                            batch = await insert_batch(batch)
+                        if batch:
+                            # ainsert records per-document failures in doc_status instead of raising
+                            done_ids, failed = await self._split_by_doc_status([doc_id for _, doc_id, _, _ in batch])
+                            for doc_path, doc_id, _, _ in batch:
+                                if doc_id in failed:
+                                    errors.append(f"{doc_path.name}: {failed[doc_id]}")
+                            if manifest:
+                                await asyncio.to_thread(
+                                    manifest.record,
+                                    [(digest, path) for path, doc_id, _, digest in batch if doc_id in done_ids],
+                                )
+                            batch = [entry for entry in batch if entry[1] not in failed]
+                except Exception as exc:
+                    LOGGER.exception("Failed to ingest batch of %d documents", len(batch))
+                    errors.extend(f"{doc_path.name}: {exc}" for doc_path, _, _, _ in batch)
+                    continue
+                processed += len(batch)
+                report_progress()
+            await producer
+        finally:
+            # never leave the producer blocked on a full queue if we stop early
+            producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+        if unchanged:
+            LOGGER.info("Skipped %d unchanged documents", unchanged)
+        if not inserted_any:
+            # ainsert normally drains LightRAG's queue; without it, pending or failed documents would never be retried
+            try:
+                await self.rag.apipeline_process_enqueue_documents()
+            except Exception as exc:
+                LOGGER.exception("Failed to process LightRAG's pending documents")
+                errors.append(f"pending documents: {exc}")
 
-            await self._refresh_entity_cache()
+        run.documents_processed = processed + unchanged
+
+        # storage may have written the graph under a new name
+        self._graph_path = None
+
+        if processed and self._query_cache:
+            # new documents can change answers; drop everything cached so far
+            await asyncio.to_thread(self._query_cache.clear)
+
+        await self._refresh_entity_cache()
+
+    def _publish_ingest_status(self) -> None:
+        """Merge every run since ingestion was last idle into the published status.
+
+        Runs only touch their own ``_IngestStatus``; this is the single writer of
+        ``_ingest_status`` and runs without awaiting, so overlapping runs cannot
+        interleave partial updates.
+        """
+
+        runs = self._ingest_runs
+        active = [run for run in runs if run.finished_at is None]
+        errors = [run.error for run in runs if run.error]
+        if active:
+            status = "processing"
+        else:
+            status = "failed" if any(run.status == "failed" for run in runs) else "completed"
+
+        self._ingest_status = _IngestStatus(
+            status=status,
+            documents_processed=sum(run.documents_processed for run in runs),
+            total_documents=sum(run.total_documents for run in runs),
+            current_file=next((run.current_file for run in reversed(active) if run.current_file), None),
+            error="; ".join(errors) if errors else None,
+            started_at=min(run.started_at for run in runs),
+            finished_at=None if active else max(run.finished_at for run in runs),
+        )
+        if not active:
+            runs.clear()
+
+    async def _split_by_doc_status(self, ids: Sequence[str]) -> tuple[set[str], dict[str, str]]:
+        """Return the ids LightRAG finished processing and the error for each one it marked failed."""
+
+        try:
+            statuses = await self.rag.aget_docs_by_ids(list(ids))
+        except Exception:
+            LOGGER.warning("Could not read document status; leaving batch out of the manifest", exc_info=True)
+            return set(), {}
+
+        processed: set[str] = set()
+        failed: dict[str, str] = {}
+        for doc_id, doc_status in statuses.items():
+            if doc_status.status == DocStatus.PROCESSED:
+                processed.add(doc_id)
+            elif doc_status.status == DocStatus.FAILED:
+                failed[doc_id] = doc_status.error_msg or "LightRAG failed to process the document"
+        return processed, failed
+
+    def _lock_for(self, doc_id: str) -> asyncio.Lock:
+        """Return the lock serialising inserts of ``doc_id``; it lives while anyone holds it."""
+
+        lock = self._doc_locks.get(doc_id)
+        if lock is None:
+            lock = self._doc_locks.setdefault(doc_id, asyncio.Lock())
+        return lock
 
     async def start_ingestion(self, corpus_dir: Path) -> IngestStatus:
         """Launch ingestion in the background if not already running."""
 
         if self._ingest_task and not self._ingest_task.done():
             LOGGER.info("Ingestion already in progress")
-            return self._ingest_status
+            return self.get_ingest_status()
 
-        self._ingest_status = IngestStatus(status="processing", started_at=datetime.utcnow())
+        self._ingest_status = _IngestStatus(status="processing", started_at=datetime.now(_UTC))
 
         async def runner() -> None:
             try:
@@ -243,23 +549,29 @@ class LightRAGWrapper:
 
         loop = asyncio.get_running_loop()
         self._ingest_task = loop.create_task(runner())
-        return self._ingest_status
+        return self.get_ingest_status()
 
     def get_ingest_status(self) -> IngestStatus:
-        return self._ingest_status
+        return IngestStatus(**asdict(self._ingest_status))
 
     def get_graph_path(self) -> Path:
         """Return the path to the GraphML file managed by LightRAG."""
 
+        if self._graph_path is not None:
+            return self._graph_path
+
         storage = getattr(self.rag, 'chunk_entity_relation_graph', None)
         if storage is not None:
             raw_path = getattr(storage, '_graphml_xml_file', None)
             if raw_path:
-                return Path(raw_path)
+                self._graph_path = Path(raw_path)
+                return self._graph_path
 
         candidates = sorted(self._settings.lightrag_working_path.glob('*.graphml'))
         if candidates:
-            return candidates[0]
+            self._graph_path = candidates[0]
+            return self._graph_path
+        # not memoised: the file may appear once something has been ingested
         return self._settings.lightrag_working_path / 'graph.graphml'
 
     async def refresh_entity_cache(self) -> None:
@@ -275,34 +587,65 @@ class LightRAGWrapper:
     def extract_entities_from_text(self, text: str, *, additional_entities: Iterable[str] | None = None) -> list[str]:
         """Extract known entity labels from the given text."""
 
-        candidates = set(self._entity_cache)
-        if additional_entities:
-            candidates.update(additional_entities)
-
         lowered = text.lower()
-        matches = {
-            entity for entity in candidates if entity.lower() in lowered
-        }
+        matches: set[str] = set()
+        automatons = [self._entity_automaton]
+        if additional_entities:
+            cache = self._entity_cache
+            extras = self._lower_entity_map(entity for entity in additional_entities if entity not in cache)
+            automatons.append(self._build_entity_automaton(extras))
+
+        for automaton in automatons:
+            if automaton is not None:
+                for _, originals in automaton.iter(lowered):
+                    matches.update(originals)
         return sorted(matches)
 
+    @staticmethod
+    def _lower_entity_map(entities: Iterable[str]) -> dict[str, tuple[str, ...]]:
+        """Group entities by their lower-case form so case variants share one pattern."""
+
+        grouped: dict[str, list[str]] = {}
+        for entity in entities:
+            if entity:
+                grouped.setdefault(entity.lower(), []).append(entity)
+        return {lowered: tuple(originals) for lowered, originals in grouped.items()}
+
+    @staticmethod
+    def _build_entity_automaton(lower_map: dict[str, tuple[str, ...]]) -> ahocorasick.Automaton | None:
+        """Build an Aho-Corasick automaton matching the lower-case forms as substrings."""
+
+        if not lower_map:
+            return None
+        automaton = ahocorasick.Automaton()
+        for lowered, originals in lower_map.items():
+            automaton.add_word(lowered, originals)
+        automaton.make_automaton()
+        return automaton
+
     async def _refresh_entity_cache(self) -> None:
         if not self._rag:
             return
-        try:
-            labels = await self._rag.get_graph_labels()
-        except Exception:  # pragma: no cover - best-effort cache refresh
-            LOGGER.debug("Failed to refresh graph labels", exc_info=True)
-            labels = []
-
-        if isinstance(labels, Counter):
-            entities = set(labels.keys())
-        elif isinstance(labels, (list, tuple, set)):
-            entities = {str(label) for label in labels}
-        elif isinstance(labels, str):
-            entities = {piece.strip() for piece in labels.split("\n") if piece.strip()}
-        else:
-            entities = set()
+        # serialise refreshes so a slow, stale label fetch cannot overwrite a newer one
+        async with self._entity_refresh_lock:
+            try:
+                labels = await self._rag.get_graph_labels()
+            except Exception:  # pragma: no cover - best-effort cache refresh
+                LOGGER.debug("Failed to refresh graph labels", exc_info=True)
+                labels = []
+
+            if isinstance(labels, Counter):
+                entities = set(labels.keys())
+            elif isinstance(labels, (list, tuple, set)):
+                entities = {str(label) for label in labels}
+            elif isinstance(labels, str):
+                entities = {piece.strip() for piece in labels.split("\n") if piece.strip()}
+            else:
+                entities = set()
+
+            if not entities or entities == self._entity_cache:
+                return
 
-        if entities:
-            self._entity_cache = entities
+            automaton = self._build_entity_automaton(self._lower_entity_map(entities))
+            self._entity_cache, self._entity_automaton = entities, automaton
 
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+class _ModeVectors:
+    """Unit-normalised question embeddings for one mode, kept in memory.
+
+    Rows are appended into spare capacity and the arrays are reallocated on
+    growth or pruning, so a reader holding a view of the first ``size`` rows is
+    never disturbed by later appends.
+    """
+
+    __slots__ = ("dim", "hashes", "positions", "matrix", "timestamps", "size")
+
+    def __init__(self, dim: int, capacity: int = 16) -> None:
+        self.dim = dim
+        self.hashes: list[str] = []
+        self.positions: dict[str, int] = {}
+        self.matrix = np.empty((capacity, dim), dtype=np.float32)
+        self.timestamps = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def upsert(self, digest: str, vector: np.ndarray, ts: float) -> None:
+        position = self.positions.get(digest)
+        if position is None:
+            position = self.size
+            if position == len(self.matrix):
+                capacity = max(16, 2 * position)
+                matrix = np.empty((capacity, self.dim), dtype=np.float32)
+                matrix[:position] = self.matrix[:position]
+                timestamps = np.empty(capacity, dtype=np.float64)
+                timestamps[:position] = self.timestamps[:position]
+                self.matrix, self.timestamps = matrix, timestamps
+            self.hashes.append(digest)
+            self.positions[digest] = position
+            self.size += 1
+        self.matrix[position] = vector
+        self.timestamps[position] = ts
+
+    def prune(self, cutoff: float) -> None:
+        keep = self.timestamps[: self.size] >= cutoff
+        if keep.all():
+            return
+        self.matrix = self.matrix[: self.size][keep]
+        self.timestamps = self.timestamps[: self.size][keep]
+        self.hashes = [digest for digest, kept in zip(self.hashes, keep) if kept]
+        self.positions = {digest: position for position, digest in enumerate(self.hashes)}
+        self.size = len(self.hashes)
+
+
+class QueryCache:
+    """SQLite-backed cache of LightRAG answers with exact and semantic lookup.
+
+    Entries are namespaced by query mode. A lookup first tries the SHA-256 of the
+    normalised question and then falls back to the stored question whose
+    embedding is most similar, accepting it above ``threshold`` cosine similarity.
+    Embeddings are loaded into an in-memory matrix per mode on first use and kept
+    in step with ``put``, so similarity search never re-reads BLOBs from disk.
+    """
+
+    def __init__(self, path: Path, *, ttl_seconds: float, threshold: float) -> None:
+        self._ttl_seconds = ttl_seconds
+        self._threshold = threshold
+        self._lock = threading.Lock()
+        self._vectors: dict[str, _ModeVectors] = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    hash TEXT PRIMARY KEY,
+                    question TEXT NOT NULL,
+                    mode TEXT NOT NULL,
+                    embedding BLOB,
+                    response TEXT NOT NULL,
+                    ts REAL NOT NULL
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS query_cache_mode ON query_cache (mode, ts)")
+
+    @staticmethod
+    def _normalise(question: str) -> str:
+        return " ".join(question.lower().split())
+
+    @classmethod
+    def _key(cls, mode: str, question: str) -> str:
+        return hashlib.sha256(f"{mode}|{cls._normalise(question)}".encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray | None:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _cutoff(self) -> float:
+        return time.time() - self._ttl_seconds
+
+    def _load_vectors(self, mode: str, dim: int) -> _ModeVectors:
+        # caller holds the lock
+        rows = self._conn.execute(
+            "SELECT hash, embedding, ts FROM query_cache WHERE mode = ? AND ts >= ? AND length(embedding) = ?",
+            (mode, self._cutoff(), dim * 4),
+        ).fetchall()
+        vectors = _ModeVectors(dim, capacity=max(16, len(rows)))
+        for digest, blob, ts in rows:
+            unit = self._unit(np.frombuffer(blob, dtype=np.float32))
+            if unit is not None:
+                vectors.upsert(digest, unit, ts)
+        self._vectors[mode] = vectors
+        return vectors
+
+    def get_exact(self, mode: str, question: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM query_cache WHERE hash = ? AND ts >= ?",
+                (self._key(mode, question), self._cutoff()),
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_similar(self, mode: str, embedding: np.ndarray) -> str | None:
+        query = self._unit(embedding)
+        if query is None:
+            return None
+
+        with self._lock:
+            vectors = self._vectors.get(mode)
+            if vectors is None or vectors.dim != query.size:
+                vectors = self._load_vectors(mode, query.size)
+            size = vectors.size
+            matrix, timestamps, hashes = vectors.matrix[:size], vectors.timestamps[:size], vectors.hashes
+        if not size:
+            return None
+
+        # rows are unit vectors, so the dot product is the cosine similarity
+        similarity = matrix @ query
+        similarity[timestamps < self._cutoff()] = -np.inf
+        best = int(np.argmax(similarity))
+        if similarity[best] < self._threshold:
+            return None
+
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response FROM query_cache WHERE hash = ?",
+                (hashes[best],),
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, mode: str, question: str, embedding: np.ndarray | None, response: str) -> None:
+        blob = None
+        unit = None
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32).ravel()
+            blob = vector.tobytes()
+            unit = self._unit(vector)
+
+        digest = self._key(mode, question)
+        now = time.time()
+        cutoff = now - self._ttl_seconds
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO query_cache (hash, question, mode, embedding, response, ts) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (digest, question, mode, blob, response, now),
+            )
+            self._conn.execute("DELETE FROM query_cache WHERE ts < ?", (cutoff,))
+            vectors = self._vectors.get(mode)
+            if vectors is not None and unit is not None and vectors.dim == unit.size:
+                vectors.upsert(digest, unit, now)
+            for loaded in self._vectors.values():
+                loaded.prune(cutoff)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM query_cache")
+            self._vectors.clear()
+
+    def close(self) -> None:
+        with self._lock:
+            self._vectors.clear()
+            self._conn.close()
+
+
+__all__ = ["QueryCache"]
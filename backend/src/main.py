@@ -3,6 +3,7 @@ from __future__ import annotations
 import logging
 from contextlib import asynccontextmanager
 
+import anyio.to_thread
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -14,12 +15,16 @@ from .core.lightrag_wrapper import LightRAGWrapper
 
 LOGGER = logging.getLogger(__name__)
 
+_settings: Settings = get_settings()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    settings = get_settings()
+    settings = _settings
     logging.basicConfig(level=logging.INFO)
     LOGGER.info("Starting application")
+    # graph work is offloaded to worker threads; allow more than anyio's default 40
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 100
 
     lightrag = LightRAGWrapper(settings)
     await lightrag.initialize()
@@ -37,11 +42,14 @@ async def lifespan(app: FastAPI):
         await lightrag.cleanup()
 
 
-app = FastAPI(title="Conversational Knowledge Graph API", lifespan=lifespan)
+app = FastAPI(
+    title="Conversational Knowledge Graph API",
+    lifespan=lifespan,
+)
 
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=get_settings().CORS_ORIGINS,
+    allow_origins=_settings.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
@@ -59,11 +67,12 @@ async def root() -> dict[str, str]:
 if __name__ == "__main__":
     import uvicorn
 
-    settings: Settings = get_settings()
     uvicorn.run(
         "src.main:app",
-        host=settings.API_HOST,
-        port=settings.API_PORT,
+        host=_settings.API_HOST,
+        port=_settings.API_PORT,
         reload=True,
+        loop="uvloop",
+        http="httptools",
     )
 
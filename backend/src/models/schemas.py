@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Literal, Optional
 
+import msgspec
 from pydantic import BaseModel, Field
 
 
@@ -10,7 +11,25 @@ class Message(BaseModel):
     role: Literal["user", "assistant"]
     content: str
     entities: list[str] = Field(default_factory=list)
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class HistoryMessage(msgspec.Struct, frozen=True):
+    """Conversation turn decoded with msgspec on the websocket hot path."""
+
+    role: Literal["user", "assistant"]
+    content: str
+    entities: list[str] = msgspec.field(default_factory=list)
+    timestamp: Optional[datetime] = None
+
+
+class WebSocketQuery(msgspec.Struct):
+    """Websocket query frame, decoded straight from the raw JSON bytes."""
+
+    type: str = ""
+    query: str = ""
+    mode: str = "hybrid"
+    conversation_history: list[HistoryMessage] = msgspec.field(default_factory=list)
 
 
 class QueryRequest(BaseModel):
@@ -1,27 +1,32 @@
 from __future__ import annotations
 
-import json
+import asyncio
+import hashlib
 import logging
 import re
+from functools import lru_cache
 from pathlib import Path
-from typing import Iterable, Iterator
+from typing import Iterable, Iterator, TypeVar
 
+import orjson
 from docx import Document  # type: ignore
 from pypdf import PdfReader  # type: ignore
 from pypdf.errors import FileNotDecryptedError  # type: ignore
 
 LOGGER = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
 SUPPORTED_EXTENSIONS = {".txt", ".md", ".markdown", ".pdf", ".docx", ".json"}
 
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
 
+@lru_cache(maxsize=4096)
 def slugify(value: str) -> str:
     """Return a filesystem-friendly slug for the provided value."""
 
-    value = value.strip().lower()
-    value = re.sub(r"[^a-z0-9]+", "-", value)
-    value = re.sub(r"-+", "-", value)
-    return value.strip("-") or "document"
+    return _SLUG_RE.sub("-", value.strip().lower()).strip("-") or "document"
 
 
 def iter_corpus_files(base_path: Path) -> Iterator[Path]:
@@ -31,9 +36,12 @@ def iter_corpus_files(base_path: Path) -> Iterator[Path]:
         LOGGER.warning("Corpus directory %s does not exist", base_path)
         return
 
-    for path in sorted(base_path.rglob("*")):
-        if path.is_file() and path.suffix.lower() in SUPPORTED_EXTENSIONS:
-            yield path
+    # check the suffix before is_file() so unsupported entries never hit stat()
+    yield from sorted(
+        path
+        for path in base_path.rglob("*")
+        if path.suffix.lower() in SUPPORTED_EXTENSIONS and path.is_file()
+    )
 
 
 def read_text_file(path: Path) -> str:
@@ -41,8 +49,14 @@ def read_text_file(path: Path) -> str:
 
 
 def read_json_file(path: Path) -> str:
-    content = json.loads(path.read_text(encoding="utf-8", errors="ignore"))
-    return json.dumps(content, indent=2, ensure_ascii=False)
+    raw = path.read_text(encoding="utf-8", errors="ignore")
+    if "\n" in raw.strip():
+        return raw
+    # minified documents are a single huge line, which chunks poorly
+    try:
+        return orjson.dumps(orjson.loads(raw), option=orjson.OPT_INDENT_2).decode()
+    except orjson.JSONDecodeError:
+        return raw
 
 
 def read_pdf_file(path: Path) -> str:
@@ -53,11 +67,7 @@ def read_pdf_file(path: Path) -> str:
                 raise ValueError(f"PDF '{path.name}' is encrypted and requires a password")
         except (FileNotDecryptedError, NotImplementedError) as exc:
             raise ValueError(f"PDF '{path.name}' is encrypted and cannot be processed") from exc
-    pages = []
-    for page in reader.pages:
-        text = page.extract_text() or ""
-        pages.append(text)
-    return "\n".join(pages).strip()
+    return "\n".join((page.extract_text() or "") for page in reader.pages).strip()
 
 
 def read_docx_file(path: Path) -> str:
@@ -76,6 +86,13 @@ READERS = {
 }
 
 
+def file_sha256(path: Path) -> str:
+    """Return the hex SHA-256 digest of a file's contents."""
+
+    with path.open("rb") as handle:
+        return hashlib.file_digest(handle, "sha256").hexdigest()
+
+
 def load_document_text(path: Path) -> str:
     """Load document text based on file extension."""
 
@@ -94,10 +111,16 @@ def load_document_text(path: Path) -> str:
     return text
 
 
-def chunked(iterable: Iterable[str], size: int) -> Iterator[list[str]]:
+async def aload_document_text(path: Path) -> str:
+    """Load document text in a worker thread so parsing never blocks the event loop."""
+
+    return await asyncio.to_thread(load_document_text, path)
+
+
+def chunked(iterable: Iterable[T], size: int) -> Iterator[list[T]]:
     """Yield chunks of a given size from an iterable."""
 
-    batch: list[str] = []
+    batch: list[T] = []
     for item in iterable:
         batch.append(item)
         if len(batch) >= size:
@@ -106,3 +129,34 @@ def chunked(iterable: Iterable[str], size: int) -> Iterator[list[str]]:
     if batch:
         yield batch
 
+
+def sort_by_size(paths: Iterable[Path]) -> list[tuple[Path, int]]:
+    """Return ``(path, size in bytes)`` pairs, largest first; unreadable files count as empty."""
+
+    sized = []
+    for path in paths:
+        try:
+            size = path.stat().st_size
+        except OSError:
+            size = 0
+        sized.append((path, size))
+    sized.sort(key=lambda item: item[1], reverse=True)
+    return sized
+
+
+def chunked_by_size(items: Iterable[tuple[T, int]], size: int, max_bytes: int) -> Iterator[list[T]]:
+    """Yield chunks of at most ``size`` items whose summed sizes stay within ``max_bytes``.
+
+    An item larger than ``max_bytes`` on its own still forms a chunk.
+    """
+
+    batch: list[T] = []
+    batch_bytes = 0
+    for item, item_bytes in items:
+        if batch and (len(batch) >= size or batch_bytes + item_bytes > max_bytes):
+            yield batch
+            batch, batch_bytes = [], 0
+        batch.append(item)
+        batch_bytes += item_bytes
+    if batch:
+        yield batch
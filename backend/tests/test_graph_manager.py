@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import random
+from pathlib import Path
+
+import networkx as nx
+
+from src.core.config import Settings
+from src.core.graph_manager import GraphManager
+
+
+def _graph_manager(tmp_path: Path) -> GraphManager:
+    rng = random.Random(7)
+    graph = nx.Graph()
+    graph.add_nodes_from(f"n{index}" for index in range(120))
+    nodes = list(graph.nodes)
+    for _ in range(240):
+        graph.add_edge(*rng.sample(nodes, 2), weight=rng.random())
+    path = tmp_path / "graph.graphml"
+    nx.write_graphml(graph, path)
+    return GraphManager(path, Settings(OPENAI_API_KEY="test", LIGHTRAG_WORKING_DIR=str(tmp_path)))
+
+
+def _ego_union(graph: nx.Graph, sources: list[str], radius: int) -> set[str]:
+    nodes: set[str] = set()
+    for source in sources:
+        nodes |= set(nx.ego_graph(graph, source, radius=radius))
+    return nodes
+
+
+def test_expand_sources_matches_ego_graphs(tmp_path: Path) -> None:
+    manager = _graph_manager(tmp_path)
+
+    for sources in (["n1", "n2", "n3"], ["n1", "n4"], ["n1"], ["n1", "missing"]):
+        expected = _ego_union(manager.graph, [s for s in sources if s in manager.graph], 2)
+        assert manager._expand_sources(sources, 2) == expected
+
+
+def test_expand_sources_reuses_cached_neighbourhoods(tmp_path: Path) -> None:
+    manager = _graph_manager(tmp_path)
+
+    manager._expand_sources(["n1"], 2)
+    manager._expand_sources(["n2", "n3"], 2)
+    cached = len(manager._ego_cache)
+
+    # n1 is served from its own entry; only n5 is walked and cached
+    assert manager._expand_sources(["n1", "n5"], 2) == _ego_union(manager.graph, ["n1", "n5"], 2)
+    assert len(manager._ego_cache) == cached + 1
+    # an identical group hits the cache without adding entries
+    manager._expand_sources(["n3", "n2"], 2)
+    assert len(manager._ego_cache) == cached + 1
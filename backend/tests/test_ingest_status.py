@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import asyncio
+from pathlib import Path
+from types import SimpleNamespace
+
+from lightrag.base import DocStatus
+
+from src.core.config import Settings
+from src.core.lightrag_wrapper import LightRAGWrapper
+
+
+class FakeRAG:
+    """Minimal LightRAG stand-in whose label refresh is slow enough to overlap runs."""
+
+    def __init__(self, label_delay: float) -> None:
+        self.label_delay = label_delay
+        self.statuses: dict[str, DocStatus] = {}
+
+    async def ainsert(self, texts, ids=None, **kwargs):
+        await asyncio.sleep(0.01)
+        self.statuses.update(dict.fromkeys(ids, DocStatus.PROCESSED))
+
+    async def aget_docs_by_ids(self, ids):
+        return {doc_id: SimpleNamespace(status=self.statuses[doc_id], error_msg=None) for doc_id in ids}
+
+    async def apipeline_process_enqueue_documents(self):
+        return None
+
+    async def get_graph_labels(self):
+        await asyncio.sleep(self.label_delay)
+        return []
+
+
+def _wrapper(tmp_path: Path, rag: FakeRAG) -> LightRAGWrapper:
+    settings = Settings(
+        OPENAI_API_KEY="test",
+        LIGHTRAG_WORKING_DIR=str(tmp_path / "storage"),
+        CORPUS_DIR=str(tmp_path / "corpus"),
+    )
+    wrapper = LightRAGWrapper(settings)
+    wrapper._rag = rag
+    wrapper._initialized = True
+    return wrapper
+
+
+def test_overlapping_runs_merge_into_one_status(tmp_path: Path) -> None:
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for index in range(3):
+        (corpus / f"doc{index}.txt").write_text(f"document {index}")
+    empty = tmp_path / "empty"
+    empty.mkdir()
+
+    wrapper = _wrapper(tmp_path, FakeRAG(label_delay=0.3))
+
+    async def scenario() -> None:
+        first = asyncio.create_task(wrapper.ingest_corpus(corpus))
+        await asyncio.sleep(0.1)
+        # the second run finishes while the first is still refreshing entity labels
+        await wrapper.ingest_corpus(empty)
+        during = wrapper.get_ingest_status()
+        assert during.status == "processing"
+        assert during.total_documents == 3
+        assert during.finished_at is None
+
+        await first
+
+    asyncio.run(scenario())
+
+    status = wrapper.get_ingest_status()
+    assert status.status == "completed"
+    assert status.documents_processed == 3
+    assert status.total_documents == 3
+    assert status.error is None
+    assert status.finished_at is not None
+    assert wrapper._ingest_runs == []
+
+
+def test_failed_run_marks_merged_status_failed(tmp_path: Path) -> None:
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    (corpus / "good.txt").write_text("fine")
+    other = tmp_path / "other"
+    other.mkdir()
+    (other / "broken.pdf").write_bytes(b"not a pdf")
+
+    wrapper = _wrapper(tmp_path, FakeRAG(label_delay=0.05))
+
+    async def scenario() -> None:
+        await asyncio.gather(wrapper.ingest_corpus(corpus), wrapper.ingest_corpus(other))
+
+    asyncio.run(scenario())
+
+    status = wrapper.get_ingest_status()
+    assert status.status == "failed"
+    assert status.total_documents == 2
+    assert status.documents_processed == 1
+    assert "broken.pdf" in status.error
+
+
+def test_cancelled_ingest_leaves_no_producer_behind(tmp_path: Path) -> None:
+    corpus = tmp_path / "corpus"
+    corpus.mkdir()
+    for index in range(20):
+        (corpus / f"doc{index}.txt").write_text(f"document {index}")
+
+    rag = FakeRAG(label_delay=0.0)
+
+    async def slow_insert(texts, ids=None, **kwargs):
+        await asyncio.sleep(10)
+
+    rag.ainsert = slow_insert
+    wrapper = _wrapper(tmp_path, rag)
+    wrapper._settings = wrapper._settings.model_copy(update={"INGEST_BATCH_SIZE": 2})
+
+    async def scenario() -> list[asyncio.Task]:
+        task = asyncio.create_task(wrapper.ingest_corpus(corpus))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        return [other for other in asyncio.all_tasks() if other is not asyncio.current_task()]
+
+    assert asyncio.run(scenario()) == []
+    assert wrapper.get_ingest_status().status == "failed"